@@ -0,0 +1,131 @@
+from decimal import Decimal
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+import models
+import archivo
+
+UMBRALES = (50, 80, 100)
+
+
+def _es_gasto(tipo) -> bool:
+    return tipo == models.TipoTransaccion.gasto or tipo == "gasto"
+
+
+def _presupuestos_vigentes(db: Session, id_usuario: int, id_categoria: int, fecha, bloquear: bool = False):
+    # Usa ix_presupuesto_usuario_categoria; solo devuelve los presupuestos cuyo periodo cubre la fecha
+    query = db.query(
+        models.Presupuesto.id_presupuesto,
+        models.Presupuesto.monto,
+        models.Presupuesto.consumido
+    ).filter(
+        models.Presupuesto.id_usuario == id_usuario,
+        models.Presupuesto.id_categoria == id_categoria,
+        models.Presupuesto.fecha_crea <= fecha,
+        models.Presupuesto.fecha_venc >= fecha
+    )
+    if bloquear:
+        query = query.with_for_update()
+    return query.all()
+
+
+def presupuesto_excedido(db: Session, id_usuario: int, id_categoria: int, fecha, monto):
+    # Misma ventana y mismo contador que registrar_gasto; el bloqueo evita que dos gastos simultáneos pasen la validación
+    for fila in _presupuestos_vigentes(db, id_usuario, id_categoria, fecha, bloquear=True):
+        if (fila.consumido or 0) + Decimal(str(monto)) > fila.monto:
+            return fila
+    return None
+
+
+def _ajustar_consumo(db: Session, id_presupuesto: int, delta: Decimal):
+    # Incremento atómico en la BD para no perder actualizaciones concurrentes
+    db.query(models.Presupuesto).filter(
+        models.Presupuesto.id_presupuesto == id_presupuesto
+    ).update(
+        {models.Presupuesto.consumido: models.Presupuesto.consumido + delta},
+        synchronize_session=False
+    )
+
+
+def evaluar_presupuesto(db: Session, id_presupuesto: int):
+    fila = db.query(
+        models.Presupuesto.id_usuario,
+        models.Presupuesto.id_categoria,
+        models.Presupuesto.monto,
+        models.Presupuesto.consumido,
+        models.Presupuesto.umbral_notificado
+    ).filter(models.Presupuesto.id_presupuesto == id_presupuesto).first()
+
+    if not fila or not fila.monto or fila.monto <= 0:
+        return None
+
+    porcentaje = (fila.consumido or 0) * 100 / fila.monto
+    alcanzado = max((u for u in UMBRALES if porcentaje >= u), default=0)
+    if alcanzado <= fila.umbral_notificado:
+        return None
+
+    # Solo la sesión que logra subir el umbral emite el evento: exactamente una vez por periodo
+    reclamado = db.query(models.Presupuesto).filter(
+        models.Presupuesto.id_presupuesto == id_presupuesto,
+        models.Presupuesto.umbral_notificado < alcanzado
+    ).update(
+        {models.Presupuesto.umbral_notificado: alcanzado},
+        synchronize_session=False
+    )
+    if reclamado != 1:
+        return None
+
+    notificacion = models.Notificacion(
+        id_usuario=fila.id_usuario,
+        tipo=models.TipoNotificacion.email,
+        mensaje=(
+            f"Has consumido el {alcanzado}% de tu presupuesto en la categoría ID {fila.id_categoria} "
+            f"(${fila.consumido:.2f} de ${fila.monto:.2f})."
+        ),
+        fecha_envio=None,
+        excede_presupuesto=alcanzado >= 100,
+        id_presupuesto=id_presupuesto,
+        umbral=alcanzado
+    )
+    db.add(notificacion)
+    return notificacion
+
+
+def registrar_gasto(db: Session, t):
+    if not _es_gasto(t.tipo):
+        return []
+    eventos = []
+    for fila in _presupuestos_vigentes(db, t.id_usuario, t.id_categoria, t.fecha):
+        _ajustar_consumo(db, fila.id_presupuesto, Decimal(str(t.monto)))
+        evento = evaluar_presupuesto(db, fila.id_presupuesto)
+        if evento:
+            eventos.append(evento)
+    return eventos
+
+
+def revertir_gasto(db: Session, id_usuario: int, tipo, id_categoria: int, fecha, monto):
+    if not _es_gasto(tipo):
+        return
+    for fila in _presupuestos_vigentes(db, id_usuario, id_categoria, fecha):
+        _ajustar_consumo(db, fila.id_presupuesto, -Decimal(str(monto)))
+
+
+def recalcular_presupuesto(db: Session, presupuesto: models.Presupuesto):
+    # Se ejecuta al crear o modificar un presupuesto; usa ix_transacciones_usuario_categoria_fecha
+    total = db.query(func.coalesce(func.sum(models.Transaccion.monto), 0)).filter(
+        models.Transaccion.id_usuario == presupuesto.id_usuario,
+        models.Transaccion.id_categoria == presupuesto.id_categoria,
+        models.Transaccion.tipo == models.TipoTransaccion.gasto,
+        models.Transaccion.fecha >= presupuesto.fecha_crea,
+        models.Transaccion.fecha <= presupuesto.fecha_venc
+    ).scalar()
+    if archivo.incluye_archivo(db, presupuesto.fecha_crea):
+        total += db.query(func.coalesce(func.sum(models.TransaccionArchivo.monto), 0)).filter(
+            models.TransaccionArchivo.id_usuario == presupuesto.id_usuario,
+            models.TransaccionArchivo.id_categoria == presupuesto.id_categoria,
+            models.TransaccionArchivo.tipo == models.TipoTransaccion.gasto,
+            models.TransaccionArchivo.fecha >= presupuesto.fecha_crea,
+            models.TransaccionArchivo.fecha <= presupuesto.fecha_venc
+        ).scalar()
+    presupuesto.consumido = total
+    db.flush()
+    return evaluar_presupuesto(db, presupuesto.id_presupuesto)
@@ -0,0 +1,142 @@
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+import models
+
+MESES_ACTIVOS = 12
+TAMANO_LOTE = 500
+
+
+def fecha_corte(hoy: date = None) -> date:
+    hoy = hoy or date.today()
+    meses = hoy.year * 12 + (hoy.month - 1) - MESES_ACTIVOS
+    return date(meses // 12, meses % 12 + 1, 1)
+
+
+def ultima_fecha_archivada(db: Session):
+    return db.query(func.max(models.TransaccionArchivo.fecha)).scalar()
+
+
+def incluye_archivo(db: Session, fecha_inicio: date = None) -> bool:
+    # Poda: si el rango empieza después de lo archivado solo se consulta la tabla activa
+    ultima = ultima_fecha_archivada(db)
+    if ultima is None:
+        return False
+    return fecha_inicio is None or fecha_inicio <= ultima
+
+
+def _acumular_resumen(db: Session, transacciones):
+    acumulado = {}
+    for t in transacciones:
+        clave = (t.id_usuario, t.id_categoria, t.tipo, t.fecha.replace(day=1))
+        total, num = acumulado.get(clave, (Decimal("0"), 0))
+        acumulado[clave] = (total + Decimal(str(t.monto or 0)), num + 1)
+
+    for (id_usuario, id_categoria, tipo, mes), (total, num) in acumulado.items():
+        resumen = db.query(models.ResumenMensual).filter(
+            models.ResumenMensual.id_usuario == id_usuario,
+            models.ResumenMensual.id_categoria == id_categoria,
+            models.ResumenMensual.tipo == tipo,
+            models.ResumenMensual.mes == mes
+        ).with_for_update().first()
+        if resumen:
+            resumen.total = resumen.total + total
+            resumen.num_transacciones = resumen.num_transacciones + num
+        else:
+            db.add(models.ResumenMensual(
+                id_usuario=id_usuario,
+                id_categoria=id_categoria,
+                tipo=tipo,
+                mes=mes,
+                total=total,
+                num_transacciones=num
+            ))
+
+
+def archivar_transacciones(db: Session, corte: date, lote: int = TAMANO_LOTE) -> int:
+    movidas = 0
+    while True:
+        # Se quedan en la tabla activa: las que tienen ingresos/gastos asociados (llaves foráneas)
+        # y las que no tienen usuario, categoría o tipo, que no caben en la llave de resumen_mensual
+        filas = db.query(models.Transaccion).filter(
+            models.Transaccion.fecha < corte,
+            models.Transaccion.id_usuario.isnot(None),
+            models.Transaccion.id_categoria.isnot(None),
+            models.Transaccion.tipo.isnot(None),
+            ~models.Transaccion.ingresos.any(),
+            ~models.Transaccion.gastos.any()
+        ).order_by(models.Transaccion.id_transaccion).limit(lote).all()
+        if not filas:
+            break
+
+        for t in filas:
+            db.add(models.TransaccionArchivo(
+                id_transaccion=t.id_transaccion,
+                id_usuario=t.id_usuario,
+                tipo=t.tipo,
+                descripcion=t.descripcion,
+                monto=t.monto,
+                fecha=t.fecha,
+                id_categoria=t.id_categoria
+            ))
+        _acumular_resumen(db, filas)
+        db.query(models.Transaccion).filter(
+            models.Transaccion.id_transaccion.in_([t.id_transaccion for t in filas])
+        ).delete(synchronize_session=False)
+        # Copia, resumen y borrado del lote se confirman juntos
+        db.commit()
+        db.expunge_all()
+        movidas += len(filas)
+    return movidas
+
+
+def archivar_notificaciones(db: Session, corte: date, lote: int = TAMANO_LOTE) -> int:
+    limite = datetime.combine(corte, datetime.min.time())
+    movidas = 0
+    while True:
+        # Las pendientes (fecha_envio NULL) nunca cumplen la condición y no se archivan
+        filas = db.query(models.Notificacion).filter(
+            models.Notificacion.fecha_envio < limite
+        ).order_by(models.Notificacion.id_notificacion).limit(lote).all()
+        if not filas:
+            break
+
+        for n in filas:
+            db.add(models.NotificacionArchivo(
+                id_notificacion=n.id_notificacion,
+                id_usuario=n.id_usuario,
+                tipo=n.tipo,
+                mensaje=n.mensaje,
+                fecha_envio=n.fecha_envio,
+                excede_presupuesto=n.excede_presupuesto,
+                id_presupuesto=n.id_presupuesto,
+                umbral=n.umbral,
+                id_pago_fijo=n.id_pago_fijo
+            ))
+        db.query(models.Notificacion).filter(
+            models.Notificacion.id_notificacion.in_([n.id_notificacion for n in filas])
+        ).delete(synchronize_session=False)
+        db.commit()
+        db.expunge_all()
+        movidas += len(filas)
+    return movidas
+
+
+def archivar(db: Session, hoy: date = None, lote: int = TAMANO_LOTE) -> dict:
+    corte = fecha_corte(hoy)
+    return {
+        "corte": corte,
+        "transacciones": archivar_transacciones(db, corte, lote),
+        "notificaciones": archivar_notificaciones(db, corte, lote)
+    }
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(archivar(db))
+    finally:
+        db.close()
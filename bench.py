@@ -0,0 +1,180 @@
+# Benchmark local de throughput multi-worker: python bench.py --workers 1 2 4 --duracion 10
+# Levanta gunicorn con gunicorn.conf.py para cada número de workers y lo satura con varios procesos cliente.
+# Mide /salud (sin BD) y GET /transacciones autenticado contra una BD sembrada (SQLite por defecto, o --bd).
+# Para que la escala sea visible, servidor y clientes deben correr en núcleos distintos:
+#   python bench.py --workers 1 2 4 --cpus-servidor 0-3 --cpus-clientes 4-7
+import argparse
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+RUTAS = ("/salud", "/transacciones")
+CORREO_BENCH = "bench@lanaapp.local"
+
+
+def _cpus(texto: str):
+    # "0-3,6" -> {0, 1, 2, 3, 6}
+    cpus = set()
+    for parte in texto.split(","):
+        inicio, _, fin = parte.partition("-")
+        cpus.update(range(int(inicio), int(fin or inicio) + 1))
+    return cpus
+
+
+def _fijar_cpus(cpus):
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+
+
+def sembrar(url: str, transacciones: int) -> str:
+    # Crea el esquema, un usuario y sus transacciones; devuelve un token para ese usuario
+    os.environ["DATABASE_URL"] = url
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    import migrar
+    import models
+    from auth import create_access_token
+
+    engine = create_engine(url)
+    migrar.migrar_esquema(engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        usuario = db.query(models.Usuario).filter(models.Usuario.correo == CORREO_BENCH).first()
+        if not usuario:
+            usuario = models.Usuario(nombre="Benchmark", correo=CORREO_BENCH, contrasena="-", fecha_registro=date.today())
+            categoria = models.Categoria(nombre="Benchmark")
+            db.add_all([usuario, categoria])
+            db.flush()
+            for i in range(transacciones):
+                db.add(models.Transaccion(
+                    id_usuario=usuario.id_usuario, id_categoria=categoria.id_categoria,
+                    tipo=models.TipoTransaccion.gasto, descripcion=f"gasto {i}",
+                    monto=10 + i % 90, fecha=date.today() - timedelta(days=i % 300)
+                ))
+            db.commit()
+        return create_access_token({"sub": str(usuario.id_usuario)}, timedelta(hours=1))
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def _peticion(conexion: socket.socket, ruta: str, token: str = None) -> bool:
+    # Cliente HTTP mínimo sobre sockets con keep-alive, para que el costo del cliente no domine la medición
+    autorizacion = f"Authorization: Bearer {token}\r\n" if token else ""
+    conexion.sendall(f"GET {ruta} HTTP/1.1\r\nHost: localhost\r\n{autorizacion}\r\n".encode())
+    datos = b""
+    while b"\r\n\r\n" not in datos:
+        bloque = conexion.recv(4096)
+        if not bloque:
+            return False
+        datos += bloque
+    cabeceras, cuerpo = datos.split(b"\r\n\r\n", 1)
+    longitud = 0
+    for linea in cabeceras.split(b"\r\n")[1:]:
+        nombre, _, valor = linea.partition(b":")
+        if nombre.strip().lower() == b"content-length":
+            longitud = int(valor.strip())
+    while len(cuerpo) < longitud:
+        bloque = conexion.recv(4096)
+        if not bloque:
+            return False
+        cuerpo += bloque
+    return cabeceras.startswith(b"HTTP/1.1 200")
+
+
+def _cliente(argumentos) -> int:
+    puerto, ruta, token, duracion = argumentos
+    completadas = 0
+    fin = time.monotonic() + duracion
+    conexion = None
+    while time.monotonic() < fin:
+        try:
+            if conexion is None:
+                conexion = socket.create_connection(("127.0.0.1", puerto))
+            if _peticion(conexion, ruta, token):
+                completadas += 1
+            else:
+                conexion.close()
+                conexion = None
+        except OSError:
+            conexion = None
+    if conexion:
+        conexion.close()
+    return completadas
+
+
+def _esperar_servidor(puerto: int, limite: float = 30):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            with socket.create_connection(("127.0.0.1", puerto), timeout=1) as conexion:
+                if _peticion(conexion, "/salud"):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("El servidor no respondió a tiempo")
+
+
+def medir(workers: int, puerto: int, ruta: str, token: str, url: str, clientes: int, duracion: float,
+          cpus_servidor=None, cpus_clientes=None) -> float:
+    entorno = dict(os.environ, LANAAPP_PROGRAMADOR="0", LANAAPP_ACCESSLOG="", WEB_CONCURRENCY=str(workers),
+                   DATABASE_URL=url)
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{puerto}",
+         "--max-requests", "0", "--log-level", "warning", "main:app"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=entorno,
+        # Los workers heredan la afinidad del proceso maestro
+        preexec_fn=(lambda: _fijar_cpus(cpus_servidor)) if cpus_servidor else None
+    )
+    try:
+        _esperar_servidor(puerto)
+        with multiprocessing.Pool(clientes, initializer=_fijar_cpus, initargs=(cpus_clientes,)) as pool:
+            inicio = time.monotonic()
+            total = sum(pool.map(_cliente, [(puerto, ruta, token, duracion)] * clientes))
+            transcurrido = time.monotonic() - inicio
+        if not total:
+            raise RuntimeError(f"Ninguna petición a {ruta} respondió 200")
+        return total / transcurrido
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+if __name__ == "__main__":
+    nucleos = multiprocessing.cpu_count()
+    parser = argparse.ArgumentParser(description="Throughput de main.py según el número de workers")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, nucleos} & set(range(1, nucleos + 1))))
+    parser.add_argument("--clientes", type=int, default=nucleos * 2)
+    parser.add_argument("--duracion", type=float, default=10)
+    parser.add_argument("--rutas", nargs="+", choices=RUTAS, default=list(RUTAS))
+    parser.add_argument("--bd", help="URL de la BD a sembrar (por defecto un SQLite temporal)")
+    parser.add_argument("--transacciones", type=int, default=50, help="transacciones sembradas para el usuario")
+    parser.add_argument("--cpus-servidor", type=_cpus, help="núcleos para gunicorn, p. ej. 0-3")
+    parser.add_argument("--cpus-clientes", type=_cpus, help="núcleos para los clientes, p. ej. 4-7")
+    parser.add_argument("--puerto", type=int, default=8765)
+    args = parser.parse_args()
+
+    url = args.bd or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    token = sembrar(url, args.transacciones)
+
+    print(f"núcleos: {nucleos}  servidor: {sorted(args.cpus_servidor or []) or 'sin fijar'}  "
+          f"clientes: {sorted(args.cpus_clientes or []) or 'sin fijar'}")
+    if not (args.cpus_servidor and args.cpus_clientes):
+        print("aviso: sin --cpus-servidor/--cpus-clientes los clientes compiten por los mismos núcleos que el servidor")
+    for ruta in args.rutas:
+        base = None
+        print(f"\n{ruta}")
+        print(f"{'workers':>8} {'req/s':>10} {'escala':>8}")
+        for workers in args.workers:
+            rps = medir(workers, args.puerto, ruta, token, url, args.clientes, args.duracion,
+                        args.cpus_servidor, args.cpus_clientes)
+            base = base or rps
+            print(f"{workers:>8} {rps:>10.1f} {rps / base:>7.2f}x")
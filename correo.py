@@ -1,10 +1,11 @@
+import asyncio
 import smtplib
 from email.message import EmailMessage
 
 CORREO_EMISOR = "gabriel.mzn.r.xx66@gmail.com"
 CONTRASENA_CORREO = "bhrq dzlm hzuk rcpn"
 
-async def enviar_correo(asunto: str, mensaje: str, destinatario: str):
+def _enviar(asunto: str, mensaje: str, destinatario: str):
     correo = EmailMessage()
     correo["From"] = CORREO_EMISOR
     correo["To"] = destinatario
@@ -15,5 +16,12 @@ async def enviar_correo(asunto: str, mensaje: str, destinatario: str):
         with smtplib.SMTP_SSL("smtp.gmail.com", 465) as servidor:
             servidor.login(CORREO_EMISOR, CONTRASENA_CORREO)
             servidor.send_message(correo)
+        return True
     except Exception as error:
         print("Error al enviar correo:", error)
+        return False
+
+
+async def enviar_correo(asunto: str, mensaje: str, destinatario: str):
+    # SMTP bloquea; en un hilo para no detener el event loop del worker
+    return await asyncio.to_thread(_enviar, asunto, mensaje, destinatario)
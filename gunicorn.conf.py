@@ -0,0 +1,20 @@
+# Modo multi-worker: gunicorn -c gunicorn.conf.py main:app
+import multiprocessing
+import os
+
+bind = os.getenv("LANAAPP_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Cada worker importa main.py por su cuenta: su propio pool de conexiones y su propio programador.
+# No se comparte estado en memoria; lo compartido vive en la BD (tareas_programadas, contadores de presupuesto).
+preload_app = False
+
+timeout = int(os.getenv("LANAAPP_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = os.getenv("LANAAPP_ACCESSLOG", "-") or None
+errorlog = "-"
@@ -2,7 +2,13 @@ from fastapi import FastAPI, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from database import SessionLocal
 import models
-from email import enviar_correo
+import alertas
+import archivo
+import tareas
+import asyncio
+from contextlib import asynccontextmanager
+import os
+from correo import enviar_correo
 from sqlalchemy import and_
 from datetime import datetime
 from auth import hash_password, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM
@@ -11,7 +17,7 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from typing import List, Optional
 from decimal import Decimal
-from email import enviar_correo
+from correo import enviar_correo
 
 from schemas import (
     UserCreate, UserLogin, UserOut,
@@ -21,7 +27,23 @@ from schemas import (
     PagoCreate, PagoOut
 )
 
-app = FastAPI()
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    # Cada worker arranca el programador; el candado en tareas_programadas garantiza una sola ejecución por periodo.
+    # Se desactiva con LANAAPP_PROGRAMADOR=0 (p. ej. en el benchmark).
+    programador = None
+    if os.getenv("LANAAPP_PROGRAMADOR", "1") == "1":
+        programador = asyncio.create_task(tareas.programador(TAREAS_PROGRAMADAS))
+    yield
+    if programador:
+        # Al reciclar el worker la tarea en curso se cancela y libera su candado (ver tareas.ejecutar_exclusiva)
+        programador.cancel()
+        try:
+            await programador
+        except asyncio.CancelledError:
+            pass
+
+app = FastAPI(lifespan=ciclo_de_vida)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 from fastapi.openapi.utils import get_openapi
@@ -101,26 +123,11 @@ def crear_transaccion(
     current_user: models.Usuario = Depends(get_current_user)
 ):
     if t.tipo == "gasto":
-        
-        presupuesto = db.query(models.Presupuesto).filter(
-            models.Presupuesto.id_usuario == current_user.id_usuario,
-            models.Presupuesto.id_categoria == t.id_categoria
-        ).first()
-
-        if presupuesto:
-            inicio_mes = date.today().replace(day=1)
-            gastos = db.query(models.Transaccion).filter(
-                models.Transaccion.id_usuario == current_user.id_usuario,
-                models.Transaccion.id_categoria == t.id_categoria,
-                models.Transaccion.tipo == "gasto",
-                models.Transaccion.fecha >= inicio_mes
-            ).all()
-            total_gastado = sum(g.monto for g in gastos)
-            if total_gastado + Decimal(str(t.monto)) > presupuesto.monto:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Presupuesto mensual excedido en categoría ID {t.id_categoria}."
-                )
+        if alertas.presupuesto_excedido(db, current_user.id_usuario, t.id_categoria, t.fecha, t.monto):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Presupuesto excedido en categoría ID {t.id_categoria}."
+            )
 
     transaccion = models.Transaccion(
         tipo=t.tipo,
@@ -131,28 +138,56 @@ def crear_transaccion(
         id_usuario=current_user.id_usuario
     )
     db.add(transaccion)
+    alertas.registrar_gasto(db, transaccion)
     db.commit()
     db.refresh(transaccion)
     return transaccion
 
 @app.get("/transacciones", response_model=List[TransactionOut])
-def obtener_transacciones(db: Session = Depends(get_db), current_user: models.Usuario = Depends(get_current_user)):
-    return db.query(models.Transaccion).filter(models.Transaccion.id_usuario == current_user.id_usuario).all()
+def obtener_transacciones(
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+    resultado = []
+    tablas = [models.Transaccion]
+    if archivo.incluye_archivo(db, fecha_inicio):
+        tablas.append(models.TransaccionArchivo)
+    for tabla in tablas:
+        query = db.query(tabla).filter(tabla.id_usuario == current_user.id_usuario)
+        if fecha_inicio:
+            query = query.filter(tabla.fecha >= fecha_inicio)
+        if fecha_fin:
+            query = query.filter(tabla.fecha <= fecha_fin)
+        resultado.extend(query.all())
+    return resultado
 
 @app.get("/transacciones/{id}", response_model=TransactionOut)
 def obtener_transaccion(id: int, db: Session = Depends(get_db), current_user: models.Usuario = Depends(get_current_user)):
     t = db.query(models.Transaccion).filter(models.Transaccion.id_transaccion == id, models.Transaccion.id_usuario == current_user.id_usuario).first()
+    if not t:
+        t = db.query(models.TransaccionArchivo).filter(models.TransaccionArchivo.id_transaccion == id, models.TransaccionArchivo.id_usuario == current_user.id_usuario).first()
     if not t:
         raise HTTPException(status_code=404, detail="No encontrada")
     return t
 
+def _rechazar_si_archivada(db: Session, id: int, id_usuario: int):
+    # Las archivadas ya están sumadas en resumen_mensual; son de solo lectura
+    archivada = db.query(models.TransaccionArchivo.id_transaccion).filter(models.TransaccionArchivo.id_transaccion == id, models.TransaccionArchivo.id_usuario == id_usuario).first()
+    if archivada:
+        raise HTTPException(status_code=409, detail="Transacción archivada: solo lectura")
+
 @app.put("/transacciones/{id}", response_model=TransactionOut)
 def actualizar_transaccion(id: int, trans: TransactionCreate, db: Session = Depends(get_db), current_user: models.Usuario = Depends(get_current_user)):
     t = db.query(models.Transaccion).filter(models.Transaccion.id_transaccion == id, models.Transaccion.id_usuario == current_user.id_usuario).first()
     if not t:
+        _rechazar_si_archivada(db, id, current_user.id_usuario)
         raise HTTPException(status_code=404, detail="No encontrada")
+    alertas.revertir_gasto(db, t.id_usuario, t.tipo, t.id_categoria, t.fecha, t.monto)
     for attr, value in trans.dict().items():
         setattr(t, attr, value)
+    alertas.registrar_gasto(db, t)
     db.commit()
     db.refresh(t)
     return t
@@ -161,7 +196,9 @@ def actualizar_transaccion(id: int, trans: TransactionCreate, db: Session = Depe
 def eliminar_transaccion(id: int, db: Session = Depends(get_db), current_user: models.Usuario = Depends(get_current_user)):
     t = db.query(models.Transaccion).filter(models.Transaccion.id_transaccion == id, models.Transaccion.id_usuario == current_user.id_usuario).first()
     if not t:
+        _rechazar_si_archivada(db, id, current_user.id_usuario)
         raise HTTPException(status_code=404, detail="No encontrada")
+    alertas.revertir_gasto(db, t.id_usuario, t.tipo, t.id_categoria, t.fecha, t.monto)
     db.delete(t)
     db.commit()
     return {"detail": "Eliminada"}
@@ -173,7 +210,15 @@ def resumen_por_categoria(db: Session = Depends(get_db), current_user: models.Us
         .join(models.Transaccion, models.Categoria.id_categoria == models.Transaccion.id_categoria)\
         .filter(models.Transaccion.id_usuario == current_user.id_usuario)\
         .group_by(models.Categoria.nombre).all()
-    return [{"categoria": r[0], "total": float(r[1])} for r in resumen]
+    # Lo archivado se suma desde resumen_mensual, sin leer las filas frías
+    archivado = db.query(models.Categoria.nombre, func.sum(models.ResumenMensual.total))\
+        .join(models.ResumenMensual, models.Categoria.id_categoria == models.ResumenMensual.id_categoria)\
+        .filter(models.ResumenMensual.id_usuario == current_user.id_usuario)\
+        .group_by(models.Categoria.nombre).all()
+    totales = {}
+    for nombre, total in list(resumen) + list(archivado):
+        totales[nombre] = totales.get(nombre, 0.0) + float(total or 0)
+    return [{"categoria": nombre, "total": total} for nombre, total in totales.items()]
 
 @app.get("/resumen/graficas")
 def resumen_graficas(
@@ -205,7 +250,32 @@ def resumen_graficas(
     query = query.group_by(models.Categoria.nombre)
     resultados = query.all()
 
-    return [{"categoria": r[0], "total": float(r[1]) if r[1] else 0.0} for r in resultados]
+    if archivo.incluye_archivo(db, fecha_inicio):
+        if fecha_inicio is None and fecha_fin is None:
+            tabla, columna = models.ResumenMensual, models.ResumenMensual.total
+        else:
+            tabla, columna = models.TransaccionArchivo, models.TransaccionArchivo.monto
+        archivado = db.query(
+            models.Categoria.nombre,
+            func.sum(columna).label("total")
+        ).join(
+            tabla,
+            models.Categoria.id_categoria == tabla.id_categoria
+        ).filter(
+            tabla.id_usuario == current_user.id_usuario
+        )
+        if tipo:
+            archivado = archivado.filter(tabla.tipo == tipo)
+        if fecha_inicio:
+            archivado = archivado.filter(models.TransaccionArchivo.fecha >= fecha_inicio)
+        if fecha_fin:
+            archivado = archivado.filter(models.TransaccionArchivo.fecha <= fecha_fin)
+        resultados = list(resultados) + archivado.group_by(models.Categoria.nombre).all()
+
+    totales = {}
+    for nombre, total in resultados:
+        totales[nombre] = totales.get(nombre, 0.0) + (float(total) if total else 0.0)
+    return [{"categoria": nombre, "total": total} for nombre, total in totales.items()]
 
 @app.post("/presupuestos", response_model=BudgetOut)
 def crear_presupuesto(p: BudgetCreate, db: Session = Depends(get_db), current_user: models.Usuario = Depends(get_current_user)):
@@ -217,6 +287,8 @@ def crear_presupuesto(p: BudgetCreate, db: Session = Depends(get_db), current_us
         id_categoria=p.id_categoria 
     )
     db.add(nuevo)
+    db.flush()
+    alertas.recalcular_presupuesto(db, nuevo)
     db.commit()
     db.refresh(nuevo)
     return nuevo
@@ -230,8 +302,12 @@ def actualizar_presupuesto(id: int, p: BudgetCreate, db: Session = Depends(get_d
     b = db.query(models.Presupuesto).filter(models.Presupuesto.id_presupuesto == id).first()
     if not b:
         raise HTTPException(status_code=404, detail="No encontrado")
+    # Un periodo o un monto nuevos vuelven a evaluar los umbrales desde cero
+    if (p.fecha_crea, p.fecha_venc, Decimal(str(p.monto))) != (b.fecha_crea, b.fecha_venc, b.monto):
+        b.umbral_notificado = 0
     for attr, value in p.dict().items():
         setattr(b, attr, value)
+    alertas.recalcular_presupuesto(db, b)
     db.commit()
     db.refresh(b)
     return b
@@ -372,8 +448,7 @@ def eliminar_pago(
     db.commit()
     return {"detail": "Pago eliminado correctamente"}
 
-@app.get("/notificar")
-async def notificar_pagos_fijos(db: Session = Depends(get_db)):
+async def notificar_pagos(db: Session):
     hoy = date.today()
     en_dos_dias = hoy + timedelta(days=2)
 
@@ -385,6 +460,8 @@ async def notificar_pagos_fijos(db: Session = Depends(get_db)):
     presupuestos = db.query(models.Presupuesto).all()
     notificados = []
 
+    inicio_dia = datetime.combine(hoy, datetime.min.time())
+
     for pago in pagos_fijos:
         presupuesto = next((
             p for p in presupuestos
@@ -392,6 +469,15 @@ async def notificar_pagos_fijos(db: Session = Depends(get_db)):
         ), None)
 
         if not presupuesto or presupuesto.monto < pago.monto:
+            # Idempotente: si la tarea se reintenta el mismo día, no repite los avisos ya registrados
+            ya_notificado = db.query(models.Notificacion.id_notificacion).filter(
+                models.Notificacion.id_usuario == pago.id_usuario,
+                models.Notificacion.id_pago_fijo == pago.id_pago_fijo,
+                models.Notificacion.fecha_envio >= inicio_dia
+            ).first()
+            if ya_notificado:
+                continue
+
             usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == pago.id_usuario).first()
             if usuario:
                 asunto = f"[ALERTA] Presupuesto insuficiente para '{pago.descripcion}'"
@@ -404,20 +490,80 @@ async def notificar_pagos_fijos(db: Session = Depends(get_db)):
                     f"Revisa tu app para evitar sobregiros.\n\nSaludos,\nTu app de finanzas."
                 )
 
-                await enviar_correo(asunto, mensaje, usuario.correo)
-
+                # Se registra antes de enviar: un fallo posterior no provoca un segundo correo
                 notificacion = models.Notificacion(
                     id_usuario=usuario.id_usuario,
                     tipo=models.TipoNotificacion.email,
                     mensaje=mensaje,
                     fecha_envio=datetime.now(),
-                    excede_presupuesto=True
+                    excede_presupuesto=True,
+                    id_pago_fijo=pago.id_pago_fijo
                 )
                 db.add(notificacion)
                 db.commit()
+
+                if not await enviar_correo(asunto, mensaje, usuario.correo):
+                    # El envío falló: se quita el registro para que el reintento lo vuelva a intentar
+                    db.delete(notificacion)
+                    db.commit()
+                    continue
+
                 notificados.append({
                     "usuario": usuario.correo,
                     "pago": pago.descripcion
                 })
 
-    return {"notificaciones_enviadas": notificados}
\ No newline at end of file
+    return {"notificaciones_enviadas": notificados}
+
+async def enviar_notificaciones_pendientes(db: Session):
+    # Consume las alertas de presupuesto que alertas.py deja con fecha_envio NULL
+    pendientes = db.query(models.Notificacion, models.Usuario.correo).join(
+        models.Usuario, models.Usuario.id_usuario == models.Notificacion.id_usuario
+    ).filter(
+        models.Notificacion.fecha_envio.is_(None),
+        models.Notificacion.id_presupuesto.isnot(None)
+    ).order_by(models.Notificacion.id_notificacion).limit(100).all()
+
+    enviadas = 0
+    for notificacion, correo in pendientes:
+        if notificacion.excede_presupuesto:
+            asunto = "[ALERTA] Presupuesto excedido"
+        else:
+            asunto = f"[AVISO] Has usado el {notificacion.umbral}% de tu presupuesto"
+        if await enviar_correo(asunto, notificacion.mensaje, correo):
+            notificacion.fecha_envio = datetime.now()
+            db.commit()
+            enviadas += 1
+    return {"notificaciones_enviadas": enviadas}
+
+async def archivar_historial(db: Session):
+    # Fuera del event loop para que el worker siga atendiendo peticiones mientras archiva
+    return await asyncio.to_thread(archivo.archivar, db)
+
+PERIODO_DIARIO = timedelta(days=1)
+
+# Los endpoints comparten candado y periodo con el programador: una llamada manual (o un cron)
+# después de la ejecución del día no vuelve a enviar correos.
+@app.get("/notificar")
+async def notificar_pagos_fijos(db: Session = Depends(get_db)):
+    resultado = await tareas.ejecutar_exclusiva(db, "notificar", notificar_pagos, PERIODO_DIARIO)
+    if resultado is None:
+        raise HTTPException(status_code=409, detail="La notificación ya se ejecutó hoy o se está ejecutando en otro worker")
+    return resultado
+
+@app.post("/archivar")
+async def archivar(db: Session = Depends(get_db), current_user: models.Usuario = Depends(get_current_user)):
+    resultado = await tareas.ejecutar_exclusiva(db, "archivar", archivar_historial, PERIODO_DIARIO)
+    if resultado is None:
+        raise HTTPException(status_code=409, detail="El archivado ya se ejecutó hoy o se está ejecutando en otro worker")
+    return resultado
+
+@app.get("/salud")
+def salud():
+    return {"estado": "ok", "pid": os.getpid()}
+
+TAREAS_PROGRAMADAS = [
+    ("notificar", PERIODO_DIARIO, notificar_pagos),
+    ("archivar", PERIODO_DIARIO, archivar_historial),
+    ("enviar_pendientes", timedelta(minutes=1), enviar_notificaciones_pendientes),
+]
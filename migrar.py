@@ -0,0 +1,63 @@
+# Migración del esquema: python migrar.py
+# Crea las tablas que falten, agrega columnas e índices nuevos a las existentes y recalcula
+# los contadores de presupuesto. Se puede ejecutar varias veces; solo aplica lo que falta.
+from sqlalchemy import inspect, text
+from database import Base, SessionLocal, engine
+import models
+import alertas
+
+TAMANO_LOTE = 500
+
+
+def _ddl_columna(columna, dialecto) -> str:
+    ddl = f"{columna.name} {columna.type.compile(dialect=dialecto)}"
+    if columna.server_default is not None:
+        ddl += f" DEFAULT {columna.server_default.arg}"
+    if not columna.nullable:
+        ddl += " NOT NULL"
+    return ddl
+
+
+def migrar_esquema(bind=engine):
+    # Tablas nuevas (o todas, en una BD vacía como SQLite de pruebas)
+    Base.metadata.create_all(bind)
+
+    inspector = inspect(bind)
+    with bind.begin() as conexion:
+        for tabla in Base.metadata.sorted_tables:
+            existentes = {c["name"] for c in inspector.get_columns(tabla.name)}
+            for columna in tabla.columns:
+                if columna.name not in existentes:
+                    conexion.execute(text(
+                        f"ALTER TABLE {tabla.name} ADD COLUMN {_ddl_columna(columna, bind.dialect)}"
+                    ))
+
+            indices = {i["name"] for i in inspector.get_indexes(tabla.name)}
+            for indice in tabla.indexes:
+                if indice.name not in indices:
+                    indice.create(conexion)
+
+
+def recalcular_presupuestos(db):
+    # Los presupuestos anteriores a la migración quedan con consumido = 0 hasta recalcularlos
+    ultimo = 0
+    while True:
+        lote = db.query(models.Presupuesto).filter(
+            models.Presupuesto.id_presupuesto > ultimo
+        ).order_by(models.Presupuesto.id_presupuesto).limit(TAMANO_LOTE).all()
+        if not lote:
+            break
+        for presupuesto in lote:
+            alertas.recalcular_presupuesto(db, presupuesto)
+        db.commit()
+        ultimo = lote[-1].id_presupuesto
+        db.expunge_all()
+
+
+if __name__ == "__main__":
+    migrar_esquema()
+    db = SessionLocal()
+    try:
+        recalcular_presupuestos(db)
+    finally:
+        db.close()
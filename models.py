@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DECIMAL, ForeignKey, Enum, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Date, DECIMAL, ForeignKey, Enum, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 from database import Base
 import enum
@@ -41,6 +41,10 @@ class Categoria(Base):
 
 class Transaccion(Base):
     __tablename__ = "transacciones"
+    __table_args__ = (
+        Index("ix_transacciones_usuario_categoria_fecha", "id_usuario", "id_categoria", "fecha"),
+        Index("ix_transacciones_fecha", "fecha"),
+    )
 
     id_transaccion = Column(Integer, primary_key=True, index=True, autoincrement=True)
     id_usuario = Column(Integer, ForeignKey("usuario.id_usuario"))
@@ -82,6 +86,9 @@ class Gasto(Base):
 
 class Presupuesto(Base):
     __tablename__ = "presupuesto"
+    __table_args__ = (
+        Index("ix_presupuesto_usuario_categoria", "id_usuario", "id_categoria"),
+    )
 
     id_presupuesto = Column(Integer, primary_key=True, index=True, autoincrement=True)
     id_usuario = Column(Integer, ForeignKey("usuario.id_usuario"))
@@ -89,6 +96,10 @@ class Presupuesto(Base):
     monto = Column(DECIMAL(10, 2))
     fecha_crea = Column(Date)
     fecha_venc = Column(Date)
+    # Contador mantenido por alertas.py: suma de gastos dentro de [fecha_crea, fecha_venc]
+    consumido = Column(DECIMAL(10, 2), nullable=False, default=0, server_default="0")
+    # Umbral más alto (50/80/100) ya notificado en el periodo actual
+    umbral_notificado = Column(Integer, nullable=False, default=0, server_default="0")
 
     usuario = relationship("Usuario", back_populates="presupuestos")
     categoria = relationship("Categoria")  
@@ -127,6 +138,9 @@ class PagoFijo(Base):
 
 class Notificacion(Base):
     __tablename__ = "notificaciones"
+    __table_args__ = (
+        Index("ix_notificaciones_fecha_envio", "fecha_envio"),
+    )
 
     id_notificacion = Column(Integer, primary_key=True, index=True, autoincrement=True)
     id_usuario = Column(Integer, ForeignKey("usuario.id_usuario"))
@@ -134,5 +148,67 @@ class Notificacion(Base):
     mensaje = Column(String(500))
     fecha_envio = Column(DateTime)
     excede_presupuesto = Column(Boolean, default=False)
+    id_presupuesto = Column(Integer, nullable=True)
+    umbral = Column(Integer, nullable=True)
+    id_pago_fijo = Column(Integer, nullable=True)
 
     usuario = relationship("Usuario", back_populates="notificaciones")
+
+
+# ---------- ARCHIVO ----------
+# Tablas frías con el mismo esquema que las activas; archivo.py mueve aquí las filas antiguas.
+# Sin llaves foráneas para que el movimiento por lotes no dependa del orden de borrado.
+
+class TransaccionArchivo(Base):
+    __tablename__ = "transacciones_archivo"
+    __table_args__ = (
+        Index("ix_transacciones_archivo_usuario_fecha", "id_usuario", "fecha"),
+    )
+
+    id_transaccion = Column(Integer, primary_key=True, autoincrement=False)
+    id_usuario = Column(Integer)
+    tipo = Column(Enum(TipoTransaccion))
+    descripcion = Column(String(255))
+    monto = Column(DECIMAL(10, 2))
+    fecha = Column(Date, index=True)
+    id_categoria = Column(Integer)
+
+
+class NotificacionArchivo(Base):
+    __tablename__ = "notificaciones_archivo"
+    __table_args__ = (
+        Index("ix_notificaciones_archivo_usuario_fecha", "id_usuario", "fecha_envio"),
+    )
+
+    id_notificacion = Column(Integer, primary_key=True, autoincrement=False)
+    id_usuario = Column(Integer)
+    tipo = Column(Enum(TipoNotificacion))
+    mensaje = Column(String(500))
+    fecha_envio = Column(DateTime)
+    excede_presupuesto = Column(Boolean, default=False)
+    id_presupuesto = Column(Integer, nullable=True)
+    umbral = Column(Integer, nullable=True)
+    id_pago_fijo = Column(Integer, nullable=True)
+
+
+class ResumenMensual(Base):
+    __tablename__ = "resumen_mensual"
+
+    id_usuario = Column(Integer, primary_key=True)
+    id_categoria = Column(Integer, primary_key=True)
+    tipo = Column(Enum(TipoTransaccion), primary_key=True)
+    mes = Column(Date, primary_key=True)
+    total = Column(DECIMAL(12, 2), nullable=False, default=0)
+    num_transacciones = Column(Integer, nullable=False, default=0)
+
+
+# ---------- TAREAS PROGRAMADAS ----------
+# Un renglón por tarea; tareas.py lo usa como candado compartido entre workers.
+
+class TareaProgramada(Base):
+    __tablename__ = "tareas_programadas"
+
+    nombre = Column(String(100), primary_key=True)
+    propietario = Column(String(100), nullable=True)
+    expira = Column(DateTime, nullable=True)
+    ultima_ejecucion = Column(DateTime, nullable=True)
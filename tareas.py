@@ -0,0 +1,133 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import models
+
+# Si un worker muere a mitad de una tarea, el candado se libera solo al expirar
+DURACION_CANDADO = timedelta(minutes=10)
+INTERVALO_SEGUNDOS = 60
+_SIN_CAMBIO = object()
+
+
+def propietario() -> str:
+    # Se calcula en cada llamada para que cada proceso hijo tenga su propio PID
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _asegurar_tarea(db: Session, nombre: str):
+    if db.query(models.TareaProgramada).filter(models.TareaProgramada.nombre == nombre).first():
+        return
+    db.add(models.TareaProgramada(nombre=nombre))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Otro worker la insertó al mismo tiempo
+        db.rollback()
+
+
+def _ahora_bd(db: Session) -> datetime:
+    # Reloj de la BD: todos los workers comparan contra la misma hora aunque sus relojes difieran
+    return db.query(func.now()).scalar()
+
+
+def reclamar(db: Session, nombre: str, periodo: timedelta = None) -> bool:
+    _asegurar_tarea(db, nombre)
+    ahora = _ahora_bd(db)
+    filtros = [
+        models.TareaProgramada.nombre == nombre,
+        or_(models.TareaProgramada.expira.is_(None), models.TareaProgramada.expira < ahora)
+    ]
+    valores = {
+        models.TareaProgramada.propietario: propietario(),
+        models.TareaProgramada.expira: ahora + DURACION_CANDADO
+    }
+    if periodo:
+        filtros.append(or_(
+            models.TareaProgramada.ultima_ejecucion.is_(None),
+            models.TareaProgramada.ultima_ejecucion <= ahora - periodo
+        ))
+        # Se marca al reclamar: si el candado expira a mitad de la tarea, el periodo ya está tomado
+        valores[models.TareaProgramada.ultima_ejecucion] = ahora
+    # UPDATE condicional: la BD serializa a los workers y solo uno ve la fila afectada
+    reclamada = db.query(models.TareaProgramada).filter(*filtros).update(
+        valores, synchronize_session=False
+    )
+    db.commit()
+    return reclamada == 1
+
+
+def renovar(db: Session, nombre: str) -> bool:
+    renovada = db.query(models.TareaProgramada).filter(
+        models.TareaProgramada.nombre == nombre,
+        models.TareaProgramada.propietario == propietario()
+    ).update(
+        {models.TareaProgramada.expira: _ahora_bd(db) + DURACION_CANDADO},
+        synchronize_session=False
+    )
+    db.commit()
+    return renovada == 1
+
+
+def liberar(db: Session, nombre: str, ultima_ejecucion=_SIN_CAMBIO):
+    valores = {models.TareaProgramada.expira: None}
+    if ultima_ejecucion is not _SIN_CAMBIO:
+        valores[models.TareaProgramada.ultima_ejecucion] = ultima_ejecucion
+    db.query(models.TareaProgramada).filter(
+        models.TareaProgramada.nombre == nombre,
+        models.TareaProgramada.propietario == propietario()
+    ).update(valores, synchronize_session=False)
+    db.commit()
+
+
+async def _mantener_candado(bind, nombre: str):
+    # Renueva mientras la tarea corre; usa su propia sesión porque la de la tarea puede estar en otro hilo
+    while True:
+        await asyncio.sleep(DURACION_CANDADO.total_seconds() / 3)
+        with Session(bind=bind) as db:
+            renovar(db, nombre)
+
+
+async def ejecutar_exclusiva(db: Session, nombre: str, tarea, periodo: timedelta = None):
+    anterior = db.query(models.TareaProgramada.ultima_ejecucion).filter(
+        models.TareaProgramada.nombre == nombre
+    ).scalar()
+    if not reclamar(db, nombre, periodo):
+        return None
+    latido = asyncio.create_task(_mantener_candado(db.get_bind(), nombre))
+    try:
+        resultado = await tarea(db)
+    except (Exception, asyncio.CancelledError):
+        db.rollback()
+        # Se devuelve el periodo para que la tarea fallida o cancelada (p. ej. al reciclar el worker)
+        # se reintente; las tareas registradas deben ser idempotentes
+        if periodo:
+            liberar(db, nombre, ultima_ejecucion=anterior)
+        else:
+            liberar(db, nombre)
+        raise
+    finally:
+        latido.cancel()
+    if periodo:
+        liberar(db, nombre)
+    else:
+        liberar(db, nombre, ultima_ejecucion=_ahora_bd(db))
+    return resultado
+
+
+async def programador(tareas_registradas):
+    # Corre en todos los workers; el candado en BD decide cuál ejecuta cada tarea
+    while True:
+        for nombre, periodo, tarea in tareas_registradas:
+            db = SessionLocal()
+            try:
+                await ejecutar_exclusiva(db, nombre, tarea, periodo)
+            except Exception as error:
+                print(f"Error en tarea programada '{nombre}':", error)
+            finally:
+                db.close()
+        await asyncio.sleep(INTERVALO_SEGUNDOS)
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base  # noqa: E402
+import models  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    sesion = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    sesion.add(models.Usuario(id_usuario=1, nombre="Ana", correo="ana@example.com"))
+    sesion.add(models.Categoria(id_categoria=1, nombre="Comida"))
+    sesion.add(models.Categoria(id_categoria=2, nombre="Renta"))
+    sesion.commit()
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+        engine.dispose()
@@ -0,0 +1,123 @@
+from datetime import date
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import alertas
+import archivo
+import migrar
+import models
+
+
+def _presupuesto(db, monto=100, fecha_crea=date(2026, 1, 1), fecha_venc=date(2026, 1, 31)):
+    p = models.Presupuesto(id_usuario=1, id_categoria=1, monto=monto, fecha_crea=fecha_crea, fecha_venc=fecha_venc)
+    db.add(p)
+    db.flush()
+    alertas.recalcular_presupuesto(db, p)
+    db.commit()
+    return p
+
+
+def _gasto(db, monto, fecha=date(2026, 1, 10)):
+    t = models.Transaccion(id_usuario=1, id_categoria=1, tipo="gasto", descripcion="x", monto=monto, fecha=fecha)
+    db.add(t)
+    eventos = alertas.registrar_gasto(db, t)
+    db.commit()
+    return t, eventos
+
+
+def _estado(db, p):
+    db.refresh(p)
+    return p.consumido, p.umbral_notificado
+
+
+def test_cada_umbral_emite_una_notificacion(db):
+    p = _presupuesto(db)
+    esperados = [(40, None), (15, (50, False)), (10, None), (20, (80, False)), (20, (100, True)), (5, None)]
+
+    for monto, esperado in esperados:
+        _, eventos = _gasto(db, monto)
+        assert [(e.umbral, e.excede_presupuesto) for e in eventos] == ([esperado] if esperado else [])
+
+    assert _estado(db, p) == (110, 100)
+    notificaciones = db.query(models.Notificacion).order_by(models.Notificacion.umbral).all()
+    assert [(n.umbral, n.id_presupuesto, n.fecha_envio) for n in notificaciones] == [
+        (50, p.id_presupuesto, None), (80, p.id_presupuesto, None), (100, p.id_presupuesto, None)
+    ]
+
+
+def test_gasto_fuera_del_periodo_no_cuenta(db):
+    p = _presupuesto(db)
+    _gasto(db, 90, fecha=date(2026, 2, 1))
+    _gasto(db, 90, fecha=date(2025, 12, 31))
+    assert _estado(db, p) == (0, 0)
+    assert db.query(models.Notificacion).count() == 0
+
+
+def test_actualizar_y_eliminar_ajustan_el_contador(db):
+    p = _presupuesto(db)
+    t, _ = _gasto(db, 30)
+
+    alertas.revertir_gasto(db, t.id_usuario, t.tipo, t.id_categoria, t.fecha, t.monto)
+    t.monto = 45
+    alertas.registrar_gasto(db, t)
+    db.commit()
+    assert _estado(db, p)[0] == 45
+
+    alertas.revertir_gasto(db, t.id_usuario, t.tipo, t.id_categoria, t.fecha, t.monto)
+    db.delete(t)
+    db.commit()
+    assert _estado(db, p)[0] == 0
+
+
+def test_presupuesto_excedido_usa_el_contador(db):
+    _presupuesto(db)
+    _gasto(db, 70)
+    assert alertas.presupuesto_excedido(db, 1, 1, date(2026, 1, 20), 30) is None
+    assert alertas.presupuesto_excedido(db, 1, 1, date(2026, 1, 20), 31) is not None
+    assert alertas.presupuesto_excedido(db, 1, 1, date(2026, 2, 1), 500) is None
+
+
+def test_recalcular_incluye_gastos_archivados(db):
+    p = _presupuesto(db, fecha_crea=date(2024, 1, 1), fecha_venc=date(2024, 12, 31))
+    _gasto(db, 30, fecha=date(2024, 3, 1))
+    _gasto(db, 25, fecha=date(2024, 8, 1))
+    antes = _estado(db, p)[0]
+
+    archivo.archivar(db, hoy=date(2026, 10, 19))
+    assert db.query(models.Transaccion).count() == 0
+
+    p = db.query(models.Presupuesto).one()
+    alertas.recalcular_presupuesto(db, p)
+    db.commit()
+    assert _estado(db, p)[0] == antes == 55
+
+
+def test_migrar_agrega_columnas_y_recalcula():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conexion:
+        # Esquema previo a la migración: presupuesto sin contador ni umbral
+        conexion.execute(text(
+            "CREATE TABLE presupuesto (id_presupuesto INTEGER PRIMARY KEY, id_usuario INTEGER, "
+            "id_categoria INTEGER, monto NUMERIC(10, 2), fecha_crea DATE, fecha_venc DATE)"
+        ))
+        conexion.execute(text(
+            "INSERT INTO presupuesto VALUES (1, 1, 1, 100, '2026-01-01', '2026-01-31')"
+        ))
+
+    migrar.migrar_esquema(engine)
+    migrar.migrar_esquema(engine)
+
+    columnas = {c["name"] for c in inspect(engine).get_columns("presupuesto")}
+    assert {"consumido", "umbral_notificado"} <= columnas
+    indices = {i["name"] for i in inspect(engine).get_indexes("transacciones")}
+    assert "ix_transacciones_usuario_categoria_fecha" in indices
+
+    db = sessionmaker(bind=engine)()
+    db.add(models.Transaccion(id_usuario=1, id_categoria=1, tipo="gasto", monto=85, fecha=date(2026, 1, 4)))
+    db.commit()
+    migrar.recalcular_presupuestos(db)
+    p = db.query(models.Presupuesto).one()
+    assert (p.consumido, p.umbral_notificado) == (85, 80)
+    db.close()
@@ -0,0 +1,82 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import func
+
+import archivo
+import models
+
+HOY = date(2026, 10, 19)
+
+
+def _transaccion(db, monto, fecha, id_categoria=1, tipo="gasto"):
+    t = models.Transaccion(
+        id_usuario=1, id_categoria=id_categoria, tipo=tipo,
+        descripcion="prueba", monto=monto, fecha=fecha
+    )
+    db.add(t)
+    return t
+
+
+def _total(db, tabla, id_categoria):
+    return db.query(func.coalesce(func.sum(tabla.monto), 0)).filter(
+        tabla.id_categoria == id_categoria
+    ).scalar()
+
+
+def test_archivar_mueve_por_lotes(db):
+    for dia in range(1, 8):
+        _transaccion(db, 10, date(2024, 3, dia))
+    _transaccion(db, 99, date(2026, 9, 1))
+    db.add(models.Notificacion(id_usuario=1, tipo="email", mensaje="vieja", fecha_envio=datetime(2024, 3, 1)))
+    db.add(models.Notificacion(id_usuario=1, tipo="email", mensaje="pendiente", fecha_envio=None))
+    db.commit()
+
+    resultado = archivo.archivar(db, hoy=HOY, lote=3)
+
+    assert resultado == {"corte": date(2025, 10, 1), "transacciones": 7, "notificaciones": 1}
+    assert db.query(models.Transaccion).count() == 1
+    assert db.query(models.TransaccionArchivo).count() == 7
+    assert db.query(models.Notificacion).one().mensaje == "pendiente"
+    assert db.query(models.NotificacionArchivo).one().mensaje == "vieja"
+
+
+def test_archivar_deja_filas_sin_llave_de_resumen(db):
+    _transaccion(db, 5, date(2024, 1, 1), id_categoria=None)
+    _transaccion(db, 10, date(2024, 1, 2))
+    db.commit()
+
+    assert archivo.archivar(db, hoy=HOY, lote=1)["transacciones"] == 1
+    assert db.query(models.Transaccion).one().id_categoria is None
+
+
+def test_resumen_coincide_con_activas_mas_archivadas(db):
+    for mes in range(1, 13):
+        _transaccion(db, Decimal("12.50"), date(2024, mes, 15))
+        _transaccion(db, 100, date(2024, mes, 1), id_categoria=2, tipo="ingreso")
+    _transaccion(db, 7, date(2026, 9, 3))
+    db.commit()
+    antes = {c: _total(db, models.Transaccion, c) for c in (1, 2)}
+
+    archivo.archivar(db, hoy=HOY, lote=5)
+
+    for id_categoria in (1, 2):
+        activo = _total(db, models.Transaccion, id_categoria)
+        resumen = db.query(func.coalesce(func.sum(models.ResumenMensual.total), 0)).filter(
+            models.ResumenMensual.id_categoria == id_categoria
+        ).scalar()
+        assert activo + resumen == antes[id_categoria]
+        assert resumen == _total(db, models.TransaccionArchivo, id_categoria)
+    assert db.query(models.ResumenMensual).count() == 24
+
+
+def test_incluye_archivo_poda_rangos_recientes(db):
+    assert not archivo.incluye_archivo(db)
+
+    _transaccion(db, 10, date(2024, 6, 30))
+    db.commit()
+    archivo.archivar(db, hoy=HOY)
+
+    assert archivo.incluye_archivo(db)
+    assert archivo.incluye_archivo(db, date(2024, 6, 30))
+    assert not archivo.incluye_archivo(db, date(2024, 7, 1))
@@ -0,0 +1,99 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+import models
+import tareas
+
+DIARIO = timedelta(days=1)
+
+
+def _expirar(db, nombre):
+    db.query(models.TareaProgramada).filter(models.TareaProgramada.nombre == nombre).update(
+        {models.TareaProgramada.expira: tareas._ahora_bd(db) - timedelta(seconds=1)}
+    )
+    db.commit()
+
+
+def test_reclamar_es_exclusivo(db):
+    assert tareas.reclamar(db, "notificar")
+    assert not tareas.reclamar(db, "notificar")
+    tareas.liberar(db, "notificar")
+    assert tareas.reclamar(db, "notificar")
+
+
+def test_periodo_se_marca_al_reclamar(db):
+    assert tareas.reclamar(db, "notificar", DIARIO)
+    # El candado vence a mitad de la tarea: otro worker no debe repetirla en el mismo periodo
+    _expirar(db, "notificar")
+    assert not tareas.reclamar(db, "notificar", DIARIO)
+
+
+def test_ejecutar_exclusiva_una_vez_por_periodo(db):
+    ejecuciones = []
+
+    async def tarea(sesion):
+        ejecuciones.append(1)
+        return {"ok": True}
+
+    assert asyncio.run(tareas.ejecutar_exclusiva(db, "notificar", tarea, DIARIO)) == {"ok": True}
+    assert asyncio.run(tareas.ejecutar_exclusiva(db, "notificar", tarea, DIARIO)) is None
+    assert len(ejecuciones) == 1
+
+
+def test_tarea_fallida_se_reintenta(db):
+    async def falla(sesion):
+        raise RuntimeError("smtp caído")
+
+    async def tarea(sesion):
+        return {"ok": True}
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(tareas.ejecutar_exclusiva(db, "notificar", falla, DIARIO))
+    assert asyncio.run(tareas.ejecutar_exclusiva(db, "notificar", tarea, DIARIO)) == {"ok": True}
+
+
+def test_tarea_cancelada_libera_el_candado(db):
+    async def lenta(sesion):
+        await asyncio.sleep(60)
+
+    async def escenario():
+        tarea = asyncio.create_task(tareas.ejecutar_exclusiva(db, "archivar", lenta, DIARIO))
+        await asyncio.sleep(0.01)
+        tarea.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarea
+
+    asyncio.run(escenario())
+    assert tareas.reclamar(db, "archivar", DIARIO)
+
+
+def test_reintento_de_notificar_no_repite_correos(db, monkeypatch):
+    import main
+
+    for id_pago in (1, 2, 3):
+        db.add(models.PagoFijo(
+            id_pago_fijo=id_pago, id_usuario=1, descripcion=f"pago {id_pago}", monto=50,
+            fecha_inicio=date.today(), activo=True, categoria_id=1
+        ))
+    db.commit()
+
+    enviados = []
+
+    async def enviar_correo(asunto, mensaje, destinatario):
+        enviados.append(asunto)
+        if len(enviados) == 2:
+            raise RuntimeError("conexión perdida")
+        return True
+
+    monkeypatch.setattr(main, "enviar_correo", enviar_correo)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(tareas.ejecutar_exclusiva(db, "notificar", main.notificar_pagos, DIARIO))
+    resultado = asyncio.run(tareas.ejecutar_exclusiva(db, "notificar", main.notificar_pagos, DIARIO))
+
+    assert len(resultado["notificaciones_enviadas"]) == 1
+    assert sorted(enviados) == sorted(set(enviados))
+    assert len(enviados) == 3
+    assert db.query(models.Notificacion).filter(models.Notificacion.id_pago_fijo.isnot(None)).count() == 3